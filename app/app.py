@@ -1,17 +1,30 @@
 from __future__ import annotations
 
 import csv
+import heapq
 import re
 from dataclasses import dataclass
 from datetime import datetime
+from math import fsum
 from pathlib import Path
-from statistics import mean
 from typing import Iterable, List, Sequence
 
 from flask import Flask, jsonify, render_template, request
 
 DATA_PATH = Path(__file__).resolve().parent.parent / "listings.csv"
 
+CSV_COLUMNS = ("address", "suburb", "bed", "bath", "gar", "price", "land", "date")
+
+_NUMERIC_RE = re.compile(r"\d+(?:\.\d+)?")
+_PRICE_NOISE_RE = re.compile(r"[$,]|auction|guide|prior|offers|tba")
+_NUMERIC_DATE_RE = re.compile(r"[\d /-]+")
+
+DATE_FORMATS = {
+    "-": ("%Y-%m-%d", "%d-%m-%Y"),
+    "/": ("%d/%m/%Y",),
+}
+_LAST_DATE_FORMAT: dict[str, str] = {}
+
 QUALITY_LEVELS = [
     {"id": "original_poor", "label": "Original – needs work", "multiplier": 0.90},
     {"id": "original_sound", "label": "Original – good condition", "multiplier": 1.00},
@@ -38,9 +51,14 @@ FEATURE_OPTIONS = [
     {"id": "water_tank", "label": "Rainwater tank", "adjustment": 3000},
 ]
 
+QUALITY_MULTIPLIERS = {level["id"]: level["multiplier"] for level in QUALITY_LEVELS}
+FEATURE_ADJUSTMENTS = {option["id"]: option["adjustment"] for option in FEATURE_OPTIONS}
+
 
 @dataclass
 class PropertyRecord:
+    __slots__ = ("address", "suburb", "bedrooms", "bathrooms", "parking", "price", "land_size", "date")
+
     address: str
     suburb: str
     bedrooms: int | None
@@ -63,9 +81,21 @@ class PropertyRecord:
         }
 
 
+@dataclass
+class ComparableAverages:
+    __slots__ = ("price", "land_size", "bathrooms", "parking")
+
+    price: float | None
+    land_size: float | None
+    bathrooms: float | None
+    parking: float | None
+
+
 def parse_int(value: str | None) -> int | None:
     if value is None or value == "":
         return None
+    if value.isdecimal():
+        return int(value)
     try:
         return int(float(value))
     except (TypeError, ValueError):
@@ -84,15 +114,7 @@ def parse_float(value: str | None) -> float | None:
 def parse_price(value: str | None) -> int | None:
     if not value:
         return None
-    cleaned = value.strip().lower()
-    cleaned = cleaned.replace("$", "").replace(",", "")
-    cleaned = cleaned.replace("auction", "")
-    cleaned = cleaned.replace("guide", "")
-    cleaned = cleaned.replace("prior", "")
-    cleaned = cleaned.replace("offers", "")
-    cleaned = cleaned.replace("auction", "")
-    cleaned = cleaned.replace("tba", "")
-    cleaned = cleaned.strip()
+    cleaned = _PRICE_NOISE_RE.sub("", value.lower()).strip()
     if not cleaned:
         return None
     multiplier = 1
@@ -106,7 +128,7 @@ def parse_price(value: str | None) -> int | None:
         multiplier = 1_000
         cleaned = cleaned[:-1]
     cleaned = cleaned.strip("+").strip()
-    match = re.search(r"\d+(?:\.\d+)?", cleaned)
+    match = _NUMERIC_RE.search(cleaned)
     if not match:
         return None
     try:
@@ -124,8 +146,7 @@ def parse_price(value: str | None) -> int | None:
 def parse_land_size(value: str | None) -> float | None:
     if not value:
         return None
-    cleaned = value.lower().replace(",", "")
-    match = re.search(r"\d+(?:\.\d+)?", cleaned)
+    match = _NUMERIC_RE.search(value.replace(",", ""))
     if not match:
         return None
     try:
@@ -137,62 +158,179 @@ def parse_land_size(value: str | None) -> float | None:
 def parse_date(value: str | None) -> datetime | None:
     if not value:
         return None
-    for fmt in ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y"):
+    cleaned = value.strip()
+    if not _NUMERIC_DATE_RE.fullmatch(cleaned):
+        return None
+    separator = "/" if "/" in cleaned else "-"
+    last_format = _LAST_DATE_FORMAT.get(separator)
+    if last_format is not None:
         try:
-            return datetime.strptime(value.strip(), fmt)
+            return datetime.strptime(cleaned, last_format)
         except ValueError:
+            pass
+    for fmt in DATE_FORMATS[separator]:
+        if fmt == last_format:
             continue
+        try:
+            parsed = datetime.strptime(cleaned, fmt)
+        except ValueError:
+            continue
+        _LAST_DATE_FORMAT[separator] = fmt
+        return parsed
     return None
 
 
 def load_property_records() -> list[PropertyRecord]:
     records: list[PropertyRecord] = []
     with DATA_PATH.open(encoding="utf-8-sig", newline="") as handle:
-        reader = csv.DictReader(handle)
+        reader = csv.reader(handle)
+        header = next(reader, None)
+        if header is None:
+            return records
+        columns = {name: position for position, name in enumerate(header)}
+        positions = [columns.get(name) for name in CSV_COLUMNS]
         for row in reader:
+            if not row:
+                continue
+            address, suburb, bed, bath, gar, price, land, date = (
+                row[position] if position is not None and position < len(row) else None
+                for position in positions
+            )
             records.append(
                 PropertyRecord(
-                    address=row.get("address", "").strip(),
-                    suburb=row.get("suburb", "").strip(),
-                    bedrooms=parse_int(row.get("bed")),
-                    bathrooms=parse_int(row.get("bath")),
-                    parking=parse_int(row.get("gar")),
-                    price=parse_price(row.get("price")),
-                    land_size=parse_land_size(row.get("land")),
-                    date=parse_date(row.get("date")),
+                    address=(address or "").strip(),
+                    suburb=(suburb or "").strip(),
+                    bedrooms=parse_int(bed),
+                    bathrooms=parse_int(bath),
+                    parking=parse_int(gar),
+                    price=parse_price(price),
+                    land_size=parse_land_size(land),
+                    date=parse_date(date),
                 )
             )
     return records
 
 
+def build_address_index(records: Iterable[PropertyRecord]) -> dict[str, PropertyRecord]:
+    index: dict[str, PropertyRecord] = {}
+    for record in records:
+        index.setdefault(record.address.lower(), record)
+    return index
+
+
+def build_search_entries(records: Iterable[PropertyRecord]) -> list[tuple[str, dict[str, str]]]:
+    seen: set[tuple[str, str]] = set()
+    entries: list[tuple[str, dict[str, str]]] = []
+    for record in records:
+        key = (record.address, record.suburb)
+        if key in seen:
+            continue
+        seen.add(key)
+        entries.append((record.address.lower(), {"address": record.address, "suburb": record.suburb}))
+    return entries
+
+
+def build_trigram_index(entries: Sequence[tuple[str, dict[str, str]]]) -> dict[str, list[int]]:
+    index: dict[str, list[int]] = {}
+    for position, (token, _) in enumerate(entries):
+        for trigram in {token[i : i + 3] for i in range(len(token) - 2)}:
+            index.setdefault(trigram, []).append(position)
+    return index
+
+
+def search_addresses(
+    entries: Sequence[tuple[str, dict[str, str]]],
+    trigram_index: dict[str, list[int]],
+    query: str,
+    limit: int = 10,
+) -> list[dict[str, str]]:
+    if len(query) < 3:
+        candidates: Iterable[int] = range(len(entries))
+    else:
+        postings = sorted(
+            (trigram_index.get(query[i : i + 3], []) for i in range(len(query) - 2)),
+            key=len,
+        )
+        if not postings[0]:
+            return []
+        candidates = sorted(set(postings[0]).intersection(*postings[1:3]))
+
+    matches: list[dict[str, str]] = []
+    for position in candidates:
+        token, match = entries[position]
+        if query in token:
+            matches.append(match)
+            if len(matches) >= limit:
+                break
+    return matches
+
+
+def build_suburb_index(records: Iterable[PropertyRecord]) -> dict[str, list[PropertyRecord]]:
+    index: dict[str, list[PropertyRecord]] = {}
+    for record in records:
+        if record.price:
+            index.setdefault(record.suburb.lower(), []).append(record)
+    return index
+
+
 def currency(value: float | int | None) -> str:
     if value is None:
         return "N/A"
     return f"${value:,.0f}"
 
 
-def average_price(records: Iterable[PropertyRecord]) -> float | None:
-    prices = [record.price for record in records if record.price]
-    if not prices:
-        return None
-    return mean(prices)
+def average(values: Sequence[float]) -> float | None:
+    return fsum(values) / len(values) if values else None
 
 
-def average_land(records: Iterable[PropertyRecord]) -> float | None:
-    land_values = [record.land_size for record in records if record.land_size]
-    if not land_values:
-        return None
-    return mean(land_values)
+def average_price(records: Iterable[PropertyRecord]) -> float | None:
+    total = 0
+    count = 0
+    for record in records:
+        if record.price:
+            total += record.price
+            count += 1
+    return total / count if count else None
+
+
+def summarize_comparables(records: Iterable[PropertyRecord]) -> ComparableAverages:
+    price_total = bath_total = parking_total = 0
+    price_count = bath_count = parking_count = 0
+    land_sizes: list[float] = []
+    for record in records:
+        if record.price:
+            price_total += record.price
+            price_count += 1
+        if record.land_size:
+            land_sizes.append(record.land_size)
+        if record.bathrooms is not None:
+            bath_total += record.bathrooms
+            bath_count += 1
+        if record.parking is not None:
+            parking_total += record.parking
+            parking_count += 1
+    return ComparableAverages(
+        price=price_total / price_count if price_count else None,
+        land_size=average(land_sizes),
+        bathrooms=bath_total / bath_count if bath_count else None,
+        parking=parking_total / parking_count if parking_count else None,
+    )
 
 
-def find_recent_sales(records: Sequence[PropertyRecord], suburb: str, limit: int = 5) -> list[PropertyRecord]:
-    suburb_records = [r for r in records if r.suburb.lower() == suburb.lower() and r.price]
-    suburb_records.sort(key=lambda r: (r.date or datetime.min), reverse=True)
-    return suburb_records[:limit]
+def find_recent_sales(
+    suburb_index: dict[str, list[PropertyRecord]], suburb: str, limit: int = 5
+) -> list[PropertyRecord]:
+    return heapq.nlargest(
+        limit,
+        suburb_index.get(suburb.lower(), []),
+        key=lambda r: (r.date or datetime.min),
+    )
 
 
-def select_comparables(records: Sequence[PropertyRecord], suburb: str, bedrooms: int | None) -> list[PropertyRecord]:
-    suburb_records = [r for r in records if r.suburb.lower() == suburb.lower() and r.price]
+def select_comparables(
+    suburb_index: dict[str, list[PropertyRecord]], suburb: str, bedrooms: int | None
+) -> list[PropertyRecord]:
+    suburb_records = list(suburb_index.get(suburb.lower(), []))
     if bedrooms is not None:
         exact = [r for r in suburb_records if r.bedrooms == bedrooms]
         if exact:
@@ -202,7 +340,8 @@ def select_comparables(records: Sequence[PropertyRecord], suburb: str, bedrooms:
 
 def calculate_estimate(
     *,
-    all_records: Sequence[PropertyRecord],
+    fallback_price: float | None,
+    suburb_index: dict[str, list[PropertyRecord]],
     suburb: str,
     bedrooms: int | None,
     bathrooms: int | None,
@@ -212,43 +351,36 @@ def calculate_estimate(
     quality_choices: dict[str, str],
     selected_features: list[str],
 ) -> dict[str, object]:
-    comparables = select_comparables(all_records, suburb, bedrooms) if suburb else []
-    base_price = average_price(comparables) or average_price(all_records)
+    comparables = select_comparables(suburb_index, suburb, bedrooms) if suburb else []
+    averages = summarize_comparables(comparables)
+    base_price = averages.price or fallback_price
     if base_price is None:
         base_price = 0
 
-    quality_map = {level["id"]: level["multiplier"] for level in QUALITY_LEVELS}
     selected_multipliers = [
-        quality_map.get(choice, 1.0)
+        QUALITY_MULTIPLIERS[choice]
         for choice in quality_choices.values()
-        if choice in quality_map
+        if choice in QUALITY_MULTIPLIERS
     ]
-    quality_multiplier = mean(selected_multipliers) if selected_multipliers else 1.0
+    quality_multiplier = average(selected_multipliers) or 1.0
 
-    feature_adjustments = {
-        option["id"]: option["adjustment"] for option in FEATURE_OPTIONS
-    }
-    feature_bonus = sum(feature_adjustments.get(feat, 0) for feat in selected_features)
+    feature_bonus = sum(FEATURE_ADJUSTMENTS.get(feat, 0) for feat in selected_features)
 
     land_adjustment = 0.0
     if land_size:
-        comparable_land_avg = average_land(comparables)
+        comparable_land_avg = averages.land_size
         if comparable_land_avg:
             land_adjustment = (land_size - comparable_land_avg) * 180
 
     bathroom_bonus = 0
     if bathrooms is not None:
-        comparable_bath_avg = mean(
-            [r.bathrooms for r in comparables if r.bathrooms is not None]
-        ) if comparables else None
+        comparable_bath_avg = averages.bathrooms
         if comparable_bath_avg is not None and bathrooms > comparable_bath_avg:
             bathroom_bonus = (bathrooms - comparable_bath_avg) * 8000
 
     parking_bonus = 0
     if parking is not None:
-        comparable_parking_avg = mean(
-            [r.parking for r in comparables if r.parking is not None]
-        ) if comparables else None
+        comparable_parking_avg = averages.parking
         if comparable_parking_avg is not None and parking > comparable_parking_avg:
             parking_bonus = (parking - comparable_parking_avg) * 6000
 
@@ -330,7 +462,17 @@ def calculate_estimate(
 
 def create_app() -> Flask:
     app = Flask(__name__)
-    app.config["PROPERTY_DATA"] = load_property_records()
+    records = load_property_records()
+    app.config["PROPERTY_DATA"] = records
+    app.config["SUBURBS"] = sorted({record.suburb for record in records if record.suburb})
+    app.config["ADDRESSES"] = sorted({record.address for record in records if record.address})
+    app.config["PROPERTY_PAYLOADS"] = {
+        address: record.serialize() for address, record in build_address_index(records).items()
+    }
+    app.config["SEARCH_ENTRIES"] = build_search_entries(records)
+    app.config["SEARCH_TRIGRAMS"] = build_trigram_index(app.config["SEARCH_ENTRIES"])
+    app.config["SUBURB_INDEX"] = build_suburb_index(records)
+    app.config["FALLBACK_PRICE"] = average_price(records)
 
     @app.context_processor
     def inject_helpers():
@@ -338,9 +480,9 @@ def create_app() -> Flask:
 
     @app.route("/", methods=["GET", "POST"])
     def appraisal():
-        records: List[PropertyRecord] = app.config["PROPERTY_DATA"]
-        suburbs = sorted({record.suburb for record in records if record.suburb})
-        addresses = sorted({record.address for record in records if record.address})
+        suburb_index: dict[str, list[PropertyRecord]] = app.config["SUBURB_INDEX"]
+        suburbs: List[str] = app.config["SUBURBS"]
+        addresses: List[str] = app.config["ADDRESSES"]
 
         result = None
         selected_suburb = None
@@ -365,7 +507,8 @@ def create_app() -> Flask:
             selected_features = form.getlist("features")
 
             result = calculate_estimate(
-                all_records=records,
+                fallback_price=app.config["FALLBACK_PRICE"],
+                suburb_index=suburb_index,
                 suburb=selected_suburb,
                 bedrooms=bedrooms,
                 bathrooms=bathrooms,
@@ -377,7 +520,7 @@ def create_app() -> Flask:
             )
 
             if selected_suburb:
-                recent_sales = find_recent_sales(records, selected_suburb)
+                recent_sales = find_recent_sales(suburb_index, selected_suburb)
 
         return render_template(
             "appraisal.html",
@@ -397,36 +540,21 @@ def create_app() -> Flask:
     @app.get("/api/property-info")
     def property_info():
         address_query = request.args.get("address", "").strip().lower()
-        records: List[PropertyRecord] = app.config["PROPERTY_DATA"]
-        for record in records:
-            if record.address.lower() == address_query:
-                return jsonify(record.serialize())
-        return jsonify({}), 404
+        if not address_query:
+            return jsonify({}), 404
+        payloads: dict[str, dict[str, str | int | float | None]] = app.config["PROPERTY_PAYLOADS"]
+        payload = payloads.get(address_query)
+        if payload is None:
+            return jsonify({}), 404
+        return jsonify(payload)
 
     @app.get("/api/properties")
     def property_search():
         query = request.args.get("q", "").strip().lower()
         if not query:
             return jsonify([])
-        records: List[PropertyRecord] = app.config["PROPERTY_DATA"]
-        matches = [
-            {
-                "address": record.address,
-                "suburb": record.suburb,
-            }
-            for record in records
-            if query in record.address.lower()
-        ]
-        seen = set()
-        deduped = []
-        for match in matches:
-            key = (match["address"], match["suburb"])
-            if key in seen:
-                continue
-            seen.add(key)
-            deduped.append(match)
-            if len(deduped) >= 10:
-                break
-        return jsonify(deduped)
+        return jsonify(
+            search_addresses(app.config["SEARCH_ENTRIES"], app.config["SEARCH_TRIGRAMS"], query)
+        )
 
     return app